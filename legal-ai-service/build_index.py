@@ -0,0 +1,64 @@
+import pickle
+import faiss
+import numpy as np
+import pyarrow as pa
+from pyarrow import feather
+from sentence_transformers import SentenceTransformer
+
+# IVF-PQ layout: OPQ rotation, IVF coarse quantizer and 32 x 8-bit PQ codes per vector
+IVF_NLIST = 4096
+PQ_M = 32
+# Each OPQ/PQ codebook has 256 centroids and k-means wants ~39 points per centroid;
+# smaller corpora get an exact flat index, which is fast at that size anyway
+PQ_MIN_TRAIN = 39 * 256
+
+def choose_nlist(num_vectors: int) -> int:
+    # k-means wants roughly 39 training points per centroid
+    return max(1, min(IVF_NLIST, num_vectors // 39))
+
+def index_spec(num_vectors: int) -> str:
+    if num_vectors < PQ_MIN_TRAIN:
+        return "Flat"
+    return f"OPQ{PQ_M},IVF{choose_nlist(num_vectors)},PQ{PQ_M}x8"
+
+def build_index(embeddings: np.ndarray) -> faiss.Index:
+    # The only normalization for stored vectors: unit length makes inner product
+    # equal to cosine similarity (queries use normalize_embeddings=True to match)
+    faiss.normalize_L2(embeddings)
+    d = embeddings.shape[1]
+    index = faiss.index_factory(d, index_spec(len(embeddings)), faiss.METRIC_INNER_PRODUCT)
+    index.train(embeddings)
+    index.add(embeddings)
+    return index
+
+def write_section_table(section_data: list, path: str):
+    table = pa.table({
+        column: [s[column] for s in section_data]
+        for column in ("act", "section_number", "full_text")
+    })
+    # Uncompressed so the service can memory-map the columns without decoding
+    feather.write_feather(table, path, compression="uncompressed")
+
+def main():
+    print("📚 Loading section data...")
+    with open("models/legal_sections.pkl", "rb") as f:
+        section_data = pickle.load(f)['section_data']
+
+    print("💾 Writing section table...")
+    write_section_table(section_data, "models/legal_sections.arrow")
+
+    print("📂 Encoding sections...")
+    model = SentenceTransformer("models/legal_embedding_model")
+    embeddings = model.encode(
+        [s['full_text'] for s in section_data],
+        batch_size=64,
+        show_progress_bar=True
+    ).astype(np.float32)
+
+    print(f"🔧 Training {index_spec(len(embeddings))} index...")
+    index = build_index(embeddings)
+    faiss.write_index(index, "models/legal_index.faiss")
+    print(f"✅ Indexed {index.ntotal} sections")
+
+if __name__ == "__main__":
+    main()
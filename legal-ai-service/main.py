@@ -1,152 +1,460 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import faiss
 import pickle
 import numpy as np
+import pyarrow as pa
+from pyarrow import feather
 import torch
 import re
 import html
-import time
+import asyncio
+import functools
+import httpx
+from urllib.parse import urljoin
+from cachetools import LRUCache, TTLCache
+from selectolax.parser import HTMLParser
 from sentence_transformers import SentenceTransformer
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import os
-from transformers import BartTokenizer, BartForConditionalGeneration
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from contextlib import asynccontextmanager, contextmanager
+from transformers import BartTokenizer, BartForConditionalGeneration, TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
 
 # Set device
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# Load BART model
-print("🔍 Loading BART model...")
-bart_tokenizer = BartTokenizer.from_pretrained("facebook/bart-large-cnn")
-bart_model = BartForConditionalGeneration.from_pretrained("facebook/bart-large-cnn").to(device)
+# Number of IVF cells probed per query (recall vs latency)
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
 
-# Load embedding model
-print("📂 Loading embedding model...")
-model = SentenceTransformer("models/legal_embedding_model")
+# BART prompt layout: fixed instruction prefix + per-request text
+BART_MAX_INPUT = 1024
+STEPS_PREFIX = "Generate 3 legal steps for:"
+SHORT_STEPS_PREFIX = "Legal steps for:"
+ANALYSIS_PREFIX = "Explain in one line:"
+RECOMMENDATIONS_PREFIX = "Generate 3 legal recommendations:"
 
-# Load FAISS index and section data
-print("📚 Loading FAISS index...")
-index = faiss.read_index("models/legal_index.faiss")
+# INT8 dynamic quantization of BART's linear layers on CPU-only hosts
+BART_CPU_INT8 = os.getenv("BART_CPU_INT8", "1") == "1"
 
-print("📚 Loading section data...")
-with open("models/legal_sections.pkl", "rb") as f:
-    data = pickle.load(f)
-    section_data = data['section_data']
-    all_acts = data['all_acts']
+# Concurrent BART generate calls per worker; parallel runs on one model compete for
+# GPU memory (or the CPU intra-op thread pool) rather than finishing sooner
+BART_CONCURRENCY = int(os.getenv("BART_CONCURRENCY", "1"))
 
-print("✅ All models loaded successfully!")
+# Query encoder runtime: "torch" (SentenceTransformer) or "onnx" (INT8 ONNX Runtime)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# Query embedding micro-batching
+EMBED_BATCH_SIZE = 32
+EMBED_MAX_WAIT = 0.01  # seconds
+EMBED_CACHE_SIZE = 4096
+
+# Per-section BART summaries, reused across requests
+SUMMARY_CACHE_SIZE = 8192
+
+# Follow-ups shorter than this re-emit the previous answer instead of calling BART
+FOLLOW_UP_SHORTCUT_LEN = 20
+FOLLOW_UP_CACHE_SIZE = 1024
+
+# Conversation sessions
+SESSION_CACHE_SIZE = 10_000
+SESSION_TTL = 3600  # seconds
+
+# Indian Kanoon case search
+KANOON_SEARCH_URL = "https://indiankanoon.org/search/"
+KANOON_CACHE_TTL = 3600  # seconds
+
+def load_models():
+    global bart_tokenizer, bart_model, bart_prefix_ids, model, index, faiss_gpu_res
+    global section_table, normalize_queries
+
+    # Load BART model
+    print("🔍 Loading BART model...")
+    bart_tokenizer = BartTokenizer.from_pretrained("facebook/bart-large-cnn")
+    bart_dtype = torch.float16 if device.type == "cuda" else torch.float32
+    bart_model = BartForConditionalGeneration.from_pretrained(
+        "facebook/bart-large-cnn",
+        torch_dtype=bart_dtype,
+        attn_implementation="sdpa"
+    ).to(device).eval()
+    if device.type == "cpu" and BART_CPU_INT8:
+        # Linear weights become int8 (fbgemm/VNNI GEMMs). lm_head is tied to the token
+        # embedding and produces the vocabulary logits, so it stays FP32 with them
+        int8_layers = {
+            name: torch.ao.quantization.default_dynamic_qconfig
+            for name, module in bart_model.named_modules()
+            if isinstance(module, torch.nn.Linear) and name != "lm_head"
+        }
+        bart_model = torch.ao.quantization.quantize_dynamic(bart_model, int8_layers, dtype=torch.qint8)
+
+    # The instruction prefixes never change, so run BPE on them once
+    bart_prefix_ids = {
+        prefix: bart_tokenizer(prefix, add_special_tokens=False).input_ids
+        for prefix in (STEPS_PREFIX, SHORT_STEPS_PREFIX, ANALYSIS_PREFIX, RECOMMENDATIONS_PREFIX)
+    }
+
+    # Load embedding model
+    print("📂 Loading embedding model...")
+    if EMBEDDING_BACKEND == "onnx":
+        from onnx_encoder import OnnxSentenceEncoder
+        model = OnnxSentenceEncoder("models/legal_embedding_model", "models/legal_embedding_onnx")
+    else:
+        model = SentenceTransformer("models/legal_embedding_model")
+
+    # Load FAISS index and section data
+    print("📚 Loading FAISS index...")
+    # Memory-map the index so only the probed inverted lists are paged in
+    index = faiss.read_index("models/legal_index.faiss", faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    # build_index.py writes unit vectors searched by inner product; a legacy L2 index
+    # holds raw vectors, and normalized queries would change its ranking
+    normalize_queries = index.metric_type == faiss.METRIC_INNER_PRODUCT
+    if not normalize_queries:
+        print("⚠️ Legacy L2 index: searching with unnormalized queries (run build_index.py to rebuild)")
+    ivf_index = faiss.try_extract_index_ivf(index)
+    if ivf_index is not None:
+        ivf_index.nprobe = FAISS_NPROBE
+
+    # faiss-cpu builds have no GPU support, so keep the CPU index as fallback
+    if device.type == "cuda" and hasattr(faiss, "StandardGpuResources"):
+        print("🚀 Moving FAISS index to GPU...")
+        faiss_gpu_res = faiss.StandardGpuResources()
+        index = faiss.index_cpu_to_gpu(faiss_gpu_res, 0, index)
+
+    print("📚 Loading section data...")
+    if os.path.exists("models/legal_sections.arrow"):
+        # Uncompressed Arrow IPC: columns are zero-copy views over the mmap'd file
+        section_table = feather.read_table("models/legal_sections.arrow", memory_map=True)
+    else:
+        # Index not rebuilt yet: build the same table in memory from the pickle
+        with open("models/legal_sections.pkl", "rb") as f:
+            section_data = pickle.load(f)['section_data']
+        section_table = pa.table({
+            column: [s[column] for s in section_data]
+            for column in ("act", "section_number", "full_text")
+        })
+
+    print("✅ All models loaded successfully!")
 
 class ConversationState:
-    def __init__(self):
-        self.sessions = {}
+    def __init__(self, maxsize: int = SESSION_CACHE_SIZE, ttl: int = SESSION_TTL):
+        # Bounded, expiring store so idle sessions don't accumulate in a long-running worker
+        self.sessions = TTLCache(maxsize=maxsize, ttl=ttl)
         
     def get_session(self, session_id: str):
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {
+        # One lookup (the entry may expire between `in` and `[]`), and re-insert on
+        # every access so follow-ups restart the session's TTL too
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = {
                 'current_context': None,
                 'references': None,
-                'cases': None,
-                'history': []
+                'cases': None
             }
-        return self.sessions[session_id]
+        self.sessions[session_id] = session
+        return session
 
     def update(self, session_id: str, query: str, answer: str, references: List[Dict], cases: List[Dict]):
         session = self.get_session(session_id)
         session['current_context'] = {
             'query': query,
-            'answer': answer,
-            'references': references,
-            'cases': cases
+            'answer': answer
         }
         session['references'] = references
         session['cases'] = cases
-        session['history'].append(('user', query))
-        session['history'].append(('assistant', answer))
 
 conv_state = ConversationState()
 
+WHITESPACE_RE = re.compile(r'\s+')
+
+FOLLOW_UP_INDICATORS = ['follow up', 'previous', 'explain', 'more info', 'about that']
+# One alternation scans the query once; substring semantics as before ("explained" still matches)
+FOLLOW_UP_RE = re.compile('|'.join(map(re.escape, FOLLOW_UP_INDICATORS)), re.IGNORECASE)
+
 def sanitize_query(query: str) -> str:
     query = html.escape(query.strip())
-    return re.sub(r'\s+', ' ', query)
+    return WHITESPACE_RE.sub(' ', query)
+
+def encode_batch(queries: List[str]) -> np.ndarray:
+    embeddings = model.encode(
+        queries,
+        batch_size=EMBED_BATCH_SIZE,
+        convert_to_tensor=True,
+        normalize_embeddings=normalize_queries,
+        device=str(device)
+    )
+    # One device->host copy per batch, at the FAISS boundary
+    return embeddings.float().cpu().numpy()
+
+class EmbeddingBatcher:
+    """Coalesces concurrent query encodes into a single model.encode call."""
+
+    def __init__(self, max_batch_size: int = EMBED_BATCH_SIZE, max_wait: float = EMBED_MAX_WAIT):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        queue = asyncio.Queue()
+        batch = []
+        self.queue = queue
+        self.worker = asyncio.create_task(self.run(queue, batch))
+        self.worker.add_done_callback(functools.partial(self.fail_pending, queue, batch))
+
+    def fail_pending(self, queue: asyncio.Queue, batch: list, worker: asyncio.Task):
+        # A dead worker must not leave requests waiting forever on their futures
+        if not worker.cancelled() and worker.exception() is not None:
+            print(f"Embedding batcher error: {worker.exception()}")
+        while not queue.empty():
+            batch.append(queue.get_nowait())
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding batcher stopped"))
+        batch.clear()
+        if self.worker is worker:
+            self.worker = None
+            self.queue = None
+
+    async def stop(self):
+        worker = self.worker
+        if worker is not None:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+        self.worker = None
+        self.queue = None
+
+    async def encode(self, query: str) -> np.ndarray:
+        if self.worker is None or self.worker.done():
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, future))
+        return await future
+
+    async def run(self, queue: asyncio.Queue, batch: list):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch.append(await queue.get())
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                embeddings = await asyncio.to_thread(encode_batch, [q for q, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                batch.clear()
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+            batch.clear()
 
-def find_relevant_sections(query: str, k: int = 5) -> List[Dict]:
-    query_embedding = model.encode([query])
+# Replaced per app lifespan so its queue and worker belong to the serving event loop
+embedding_batcher = EmbeddingBatcher()
+embedding_cache = LRUCache(maxsize=EMBED_CACHE_SIZE)
+
+async def embed_query(query: str) -> np.ndarray:
+    embedding = embedding_cache.get(query)
+    if embedding is None:
+        embedding = await embedding_batcher.encode(query)
+        # Copy so the cache doesn't keep the whole batch array alive through a row view
+        embedding_cache[query] = embedding.copy()
+    return embedding
+
+@dataclass(slots=True)
+class SectionHit:
+    act: str
+    section_number: str
+    text: str
+    score: float
+
+async def find_relevant_sections(query: str, k: int = 5) -> List[SectionHit]:
+    query_embedding = np.ascontiguousarray((await embed_query(query)).reshape(1, -1), dtype=np.float32)
     D, I = index.search(query_embedding, k)
-    return [{
-        'act': section_data[idx]['act'],
-        'section_number': section_data[idx]['section_number'],
-        'text': section_data[idx]['full_text'],
-        'score': D[0][i]
-    } for i, idx in enumerate(I[0])]
+    # IVF search pads with -1 when the probed cells hold fewer than k vectors
+    hits = I[0] >= 0
+    idxs = I[0][hits]
+    rows = section_table.take(pa.array(idxs))
+    return list(map(
+        SectionHit,
+        rows.column("act").to_pylist(),
+        rows.column("section_number").to_pylist(),
+        rows.column("full_text").to_pylist(),
+        D[0][hits].tolist()
+    ))
+
+def tokenize_prompts(prompts: List[Tuple[str, str]]):
+    # Only the variable suffix goes through the tokenizer. Every cached prefix ends in
+    # ":" and every suffix is " " + a non-space character, so the byte-level BPE
+    # pre-tokenizer always splits at the seam and splicing equals tokenizing the join
+    suffix_ids = bart_tokenizer([suffix for _, suffix in prompts], add_special_tokens=False).input_ids
+    rows = []
+    for (prefix, _), ids in zip(prompts, suffix_ids):
+        head = bart_prefix_ids[prefix]
+        budget = BART_MAX_INPUT - len(head) - 2  # room for <s> and </s>
+        rows.append([bart_tokenizer.bos_token_id] + head + ids[:budget] + [bart_tokenizer.eos_token_id])
+    return bart_tokenizer.pad({"input_ids": rows}, return_tensors="pt").to(device)
+
+@contextmanager
+def bart_inference():
+    with torch.inference_mode(), torch.autocast(device.type, dtype=torch.float16, enabled=device.type == "cuda"):
+        yield
+
+# Every generate call runs here, off the default executor that embedding and
+# streamer draining use, so short tasks never queue behind a generation
+bart_executor = ThreadPoolExecutor(max_workers=BART_CONCURRENCY, thread_name_prefix="bart")
 
-def generate_with_bart(input_text: str, max_length: int = 150) -> str:
+async def run_bart(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(bart_executor, fn, *args)
+
+class StopOnEvent(StoppingCriteria):
+    # Lets a streaming request abandon generation (e.g. client disconnected) between steps
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+def stopping_criteria(stop: Optional[threading.Event]) -> Optional[StoppingCriteriaList]:
+    return StoppingCriteriaList([StopOnEvent(stop)]) if stop is not None else None
+
+def generate_batch_with_bart(prompts: List[Tuple[str, str]], max_length: int = 150, num_beams: int = 4,
+                             stop: Optional[threading.Event] = None) -> List[str]:
     try:
-        inputs = bart_tokenizer(
-            input_text,
-            max_length=1024,
-            truncation=True,
-            return_tensors="pt"
-        ).to(device)
-        
-        summary_ids = bart_model.generate(
-            inputs.input_ids,
-            max_length=max_length,
-            num_beams=4,
-            early_stopping=True
-        )
+        with bart_inference():
+            inputs = tokenize_prompts(prompts)
+            summary_ids = bart_model.generate(
+                inputs.input_ids,
+                attention_mask=inputs.attention_mask,
+                max_length=max_length,
+                num_beams=num_beams,
+                do_sample=False,
+                early_stopping=num_beams > 1,
+                length_penalty=1.0,
+                no_repeat_ngram_size=3,
+                stopping_criteria=stopping_criteria(stop)
+            )
         
-        return bart_tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+        return bart_tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
     except Exception as e:
         print(f"BART generation error: {e}")
-        return ""
-
-def generate_direct_answer(query: str, context: str = "") -> str:
-    input_text = f"Generate 3 legal steps for: {query}. Context: {context}" if context else f"Legal steps for: {query}"
-    steps = generate_with_bart(input_text, 200)
-    return steps if steps else "Immediate legal steps:"
-
-def generate_legal_analysis(text: str, act_name: str, section_number: str) -> Dict:
-    input_text = f"Explain in one line: {act_name} Section {section_number} - {text[:1000]}"
-    summary = generate_with_bart(input_text, 100)
-    return {'summary': summary}
-
-def fetch_kanoon_results(query: str, max_results: int = 3) -> List[Dict]:
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    driver = None
+        return [""] * len(prompts)
+
+def generate_with_bart(prompt: Tuple[str, str], max_length: int = 150, num_beams: int = 4) -> str:
+    return generate_batch_with_bart([prompt], max_length, num_beams)[0]
+
+def stream_with_bart(prompt: Tuple[str, str], max_length: int = 150,
+                     stop: Optional[threading.Event] = None) -> TextIteratorStreamer:
+    # Streamers only support greedy search, so this path runs with num_beams=1
+    streamer = TextIteratorStreamer(bart_tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+    def run():
+        try:
+            with bart_inference():
+                inputs = tokenize_prompts([prompt])
+                bart_model.generate(
+                    inputs.input_ids,
+                    attention_mask=inputs.attention_mask,
+                    max_length=max_length,
+                    num_beams=1,
+                    do_sample=False,
+                    no_repeat_ngram_size=3,
+                    streamer=streamer,
+                    stopping_criteria=stopping_criteria(stop)
+                )
+        except Exception as e:
+            print(f"BART generation error: {e}")
+            streamer.end()
+
+    bart_executor.submit(run)
+    return streamer
+
+async def iter_streamer(streamer: TextIteratorStreamer):
+    # The streamer blocks on a queue, so pull each chunk off the event loop
+    while True:
+        text = await asyncio.to_thread(next, streamer, None)
+        if text is None:
+            return
+        yield text
+
+def direct_answer_prompt(query: str, context: str = "") -> Tuple[str, str]:
+    return (STEPS_PREFIX, f" {query}. Context: {context}") if context else (SHORT_STEPS_PREFIX, f" {query}")
+
+def legal_analysis_prompt(text: str, act_name: str, section_number: str) -> Tuple[str, str]:
+    return ANALYSIS_PREFIX, f" {act_name} Section {section_number} - {text[:1000]}"
+
+def recommendations_prompt(query: str, context: str) -> Tuple[str, str]:
+    return RECOMMENDATIONS_PREFIX, f" {query}. Context: {context}"
+
+# Keyed by (act, section_number): the summary only depends on the section text
+summary_cache = LRUCache(maxsize=SUMMARY_CACHE_SIZE)
+
+# Keyed by (previous answer, lowercased follow-up query)
+follow_up_cache = LRUCache(maxsize=FOLLOW_UP_CACHE_SIZE)
+
+def canned_follow_up(query: str, session: dict) -> Optional[str]:
+    previous = session['current_context']['answer']
+    if len(query) < FOLLOW_UP_SHORTCUT_LEN:
+        return f"As mentioned earlier:\n{previous}"
+    return follow_up_cache.get((previous, query.lower()))
+
+def remember_follow_up(query: str, session: dict, answer: str):
+    if answer:
+        follow_up_cache[(session['current_context']['answer'], query.lower())] = answer
+
+def new_kanoon_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=3,
+        follow_redirects=True,
+        headers={"User-Agent": "Mozilla/5.0 (compatible; legal-ai/1.0)"}
+    )
+
+# Created per app lifespan, bound to the serving event loop
+kanoon_client: Optional[httpx.AsyncClient] = None
+kanoon_cache = TTLCache(maxsize=1024, ttl=KANOON_CACHE_TTL)
+
+async def fetch_kanoon_results(query: str, max_results: int = 3) -> List[Dict]:
+    cache_key = (query, max_results)
+    cached = kanoon_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-        driver.get("https://indiankanoon.org/")
-        search_box = driver.find_element(By.ID, "search-box")
-        search_box.send_keys(query + Keys.RETURN)
-        time.sleep(3)
-        return [{
-            "title": r.text[:80],
-            "url": r.get_attribute("href")
-        } for r in driver.find_elements(By.CSS_SELECTOR, "div.result_title > a")[:max_results]]
+        response = await kanoon_client.get(KANOON_SEARCH_URL, params={"formInput": query})
+        response.raise_for_status()
+        results = [{
+            "title": r.text(separator=" ", strip=True)[:80],
+            "url": urljoin(KANOON_SEARCH_URL, r.attributes.get("href") or "")
+        } for r in HTMLParser(response.text).css("div.result_title > a")[:max_results]]
     except Exception as e:
         print(f"Kanoon error: {e}")
         return []
-    finally:
-        if driver: driver.quit()
+
+    kanoon_cache[cache_key] = results
+    return results
 
 def is_follow_up(query: str, session: dict) -> bool:
     if not session.get('current_context'):
         return False
 
-    follow_up_indicators = [
-        'follow up', 'previous', 'explain', 'more info', 'about that'
-    ]
-    return any(indicator in query.lower() for indicator in follow_up_indicators)
+    return FOLLOW_UP_RE.search(query) is not None
 
-def format_response(base_answer: str, references: List[Dict], cases: List[Dict]) -> str:
+def format_response(base_answer: str, rec_text: str, references: List[Dict], cases: List[Dict]) -> str:
     # Process steps
     steps = [line.strip() for line in base_answer.split('\n') if line.strip()]
     
@@ -157,8 +465,7 @@ def format_response(base_answer: str, references: List[Dict], cases: List[Dict])
     for ref in references[:3]:
         response += f"\n- {ref['act']} Sec {ref['section_number']}: {ref['summary']}"
     
-    # Generate recommendations
-    rec_text = generate_with_bart("Generate 3 legal recommendations: " + base_answer, 150)
+    # Recommendations
     recommendations = [line.strip() for line in rec_text.split('\n') if line.strip()]
     
     response += "\n\n📌 Key Recommendations:" 
@@ -173,7 +480,54 @@ def format_response(base_answer: str, references: List[Dict], cases: List[Dict])
     
     return response
 
-app = FastAPI()
+def follow_up_context(session: dict) -> str:
+    return "\n".join([
+        f"Previous: {session['current_context']['query']}",
+        f"Answer: {session['current_context']['answer']}"
+    ])
+
+def sections_context(sections: List[SectionHit]) -> str:
+    return "\n".join(f"{s.act} Section {s.section_number}: {s.text}" for s in sections)
+
+def split_cached_summaries(sections: List[SectionHit]) -> Tuple[Dict, List[SectionHit]]:
+    summaries = {
+        (s.act, s.section_number): summary_cache[(s.act, s.section_number)]
+        for s in sections if (s.act, s.section_number) in summary_cache
+    }
+    uncached = [s for s in sections if (s.act, s.section_number) not in summaries]
+    return summaries, uncached
+
+def build_references(sections: List[SectionHit], summaries: Dict,
+                     uncached: List[SectionHit], new_summaries: List[str]) -> List[Dict]:
+    for s, summary in zip(uncached, new_summaries):
+        summaries[(s.act, s.section_number)] = summary
+        if summary:
+            summary_cache[(s.act, s.section_number)] = summary
+
+    return [{
+        'act': s.act,
+        'section_number': s.section_number,
+        'summary': summaries[(s.act, s.section_number)],
+        'full_text': s.text[:300] + '...'
+    } for s in sections]
+
+def ndjson(event: Dict) -> str:
+    return json.dumps(event) + "\n"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global embedding_batcher, kanoon_client
+    # Load in each worker process at startup rather than at import time
+    load_models()
+    embedding_batcher = EmbeddingBatcher()
+    kanoon_client = new_kanoon_client()
+    try:
+        yield
+    finally:
+        await embedding_batcher.stop()
+        await kanoon_client.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -203,11 +557,13 @@ async def process_legal_query(request: ProcessQueryRequest):
             raise HTTPException(status_code=400, detail="Please ask a more detailed question.")
 
         if is_follow_up(query, session):
-            context = "\n".join([
-                f"Previous: {session['current_context']['query']}",
-                f"Answer: {session['current_context']['answer']}"
-            ])
-            answer = generate_direct_answer(query, context)
+            answer = canned_follow_up(query, session)
+            if answer is None:
+                answer = await run_bart(
+                    generate_with_bart, direct_answer_prompt(query, follow_up_context(session)), 200
+                )
+                remember_follow_up(query, session, answer)
+                answer = answer or "Immediate legal steps:"
             return ResponseModel(
                 answer=answer,
                 references=session['references'],
@@ -216,27 +572,30 @@ async def process_legal_query(request: ProcessQueryRequest):
                 session_id=request.session_id
             )
 
-        sections = find_relevant_sections(query)
+        sections = await find_relevant_sections(query)
         if not sections:
             raise HTTPException(status_code=404, detail="No relevant laws found")
 
-        context = "\n".join(f"{s['act']} Section {s['section_number']}: {s['text']}" 
-                      for s in sections[:2])
-        
-        base_answer = generate_direct_answer(query, context)
-        references = []
-        
-        for s in sections[:2]:
-            analysis = generate_legal_analysis(s['text'], s['act'], s['section_number'])
-            references.append({
-                'act': s['act'],
-                'section_number': s['section_number'],
-                **analysis,
-                'full_text': s['text'][:300] + '...'
-            })
-
-        cases = fetch_kanoon_results(query)
-        formatted_answer = format_response(base_answer, references, cases)
+        # Case search does not depend on BART output, so overlap it with generation
+        kanoon_task = asyncio.create_task(fetch_kanoon_results(query))
+
+        context = sections_context(sections[:2])
+        summaries, uncached = split_cached_summaries(sections[:2])
+
+        # Beam search for the answer; recommendations and section summaries are short
+        # enough that greedy decoding loses little, so they share one greedy batch
+        greedy_prompts = [recommendations_prompt(query, context)] + [
+            legal_analysis_prompt(s.text, s.act, s.section_number) for s in uncached
+        ]
+        base_answer, (rec_text, *new_summaries) = await asyncio.gather(
+            run_bart(generate_with_bart, direct_answer_prompt(query, context), 200, 4),
+            run_bart(generate_batch_with_bart, greedy_prompts, 150, 1)
+        )
+        base_answer = base_answer or "Immediate legal steps:"
+        references = build_references(sections[:2], summaries, uncached, new_summaries)
+
+        cases = await kanoon_task
+        formatted_answer = format_response(base_answer, rec_text, references, cases)
 
         conv_state.update(request.session_id, query, formatted_answer, references, cases)
         
@@ -251,5 +610,108 @@ async def process_legal_query(request: ProcessQueryRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def stream_follow_up(query: str, session: dict, session_id: str):
+    stop = threading.Event()
+    try:
+        answer = canned_follow_up(query, session)
+        if answer is not None:
+            yield ndjson({"type": "token", "text": answer})
+        else:
+            chunks = []
+            prompt = direct_answer_prompt(query, follow_up_context(session))
+            async for text in iter_streamer(stream_with_bart(prompt, 200, stop)):
+                chunks.append(text)
+                yield ndjson({"type": "token", "text": text})
+            answer = "".join(chunks).strip()
+            remember_follow_up(query, session, answer)
+            answer = answer or "Immediate legal steps:"
+
+        response = ResponseModel(
+            answer=answer,
+            references=session['references'],
+            cases=session['cases'],
+            is_follow_up=True,
+            session_id=session_id
+        )
+        yield ndjson({"type": "answer", **response.model_dump()})
+    finally:
+        # Runs on completion and when the client disconnects mid-stream
+        stop.set()
+
+async def stream_answer(query: str, sections: List[SectionHit], session_id: str):
+    stop = threading.Event()
+    kanoon_task = asyncio.create_task(fetch_kanoon_results(query))
+    context = sections_context(sections[:2])
+    summaries, uncached = split_cached_summaries(sections[:2])
+
+    # Queue the streamed answer on the BART executor first so its tokens aren't held
+    # back by the recommendations and section summaries batch
+    streamer = stream_with_bart(direct_answer_prompt(query, context), 200, stop)
+    prompts = [recommendations_prompt(query, context)] + [
+        legal_analysis_prompt(s.text, s.act, s.section_number) for s in uncached
+    ]
+    rest_task = asyncio.create_task(run_bart(generate_batch_with_bart, prompts, 150, 1, stop))
+
+    try:
+        # Cases are sent as soon as the search finishes, whatever else is still generating
+        cases = None
+        chunks = []
+        async for text in iter_streamer(streamer):
+            chunks.append(text)
+            yield ndjson({"type": "token", "text": text})
+            if cases is None and kanoon_task.done():
+                cases = kanoon_task.result()
+                yield ndjson({"type": "cases", "cases": cases})
+        base_answer = "".join(chunks).strip() or "Immediate legal steps:"
+
+        if cases is None:
+            await asyncio.wait({kanoon_task, rest_task}, return_when=asyncio.FIRST_COMPLETED)
+            if kanoon_task.done():
+                cases = kanoon_task.result()
+                yield ndjson({"type": "cases", "cases": cases})
+
+        rec_text, *new_summaries = await rest_task
+        references = build_references(sections[:2], summaries, uncached, new_summaries)
+        yield ndjson({"type": "references", "references": references})
+
+        if cases is None:
+            cases = await kanoon_task
+            yield ndjson({"type": "cases", "cases": cases})
+
+        formatted_answer = format_response(base_answer, rec_text, references, cases)
+        conv_state.update(session_id, query, formatted_answer, references, cases)
+        response = ResponseModel(
+            answer=formatted_answer,
+            references=references,
+            cases=cases,
+            is_follow_up=False,
+            session_id=session_id
+        )
+        yield ndjson({"type": "answer", **response.model_dump()})
+    finally:
+        # Runs on completion and when the client disconnects mid-stream: stop both
+        # BART threads at their next decoding step and drop the pending tasks
+        stop.set()
+        kanoon_task.cancel()
+        rest_task.cancel()
+
+@app.post("/process-query/stream")
+async def stream_legal_query(request: ProcessQueryRequest):
+    session = conv_state.get_session(request.session_id)
+    query = sanitize_query(request.query)
+
+    if len(query) < 3:
+        raise HTTPException(status_code=400, detail="Please ask a more detailed question.")
+
+    if is_follow_up(query, session):
+        events = stream_follow_up(query, session, request.session_id)
+    else:
+        sections = await find_relevant_sections(query)
+        if not sections:
+            raise HTTPException(status_code=404, detail="No relevant laws found")
+        events = stream_answer(query, sections, request.session_id)
+
+    return StreamingResponse(events, media_type="application/x-ndjson")
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=int(os.getenv("UVICORN_WORKERS", "1")))
\ No newline at end of file
@@ -0,0 +1,114 @@
+import json
+import os
+import numpy as np
+import torch
+from transformers import AutoTokenizer
+from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+QUANTIZED_FILE = "model_quantized.onnx"
+
+def export_quantized(model_dir: str, onnx_dir: str):
+    print("🔧 Exporting embedding model to INT8 ONNX...")
+    ort_model = ORTModelForFeatureExtraction.from_pretrained(model_dir, export=True)
+    ort_model.save_pretrained(onnx_dir)
+    AutoTokenizer.from_pretrained(model_dir).save_pretrained(onnx_dir)
+    quantizer = ORTQuantizer.from_pretrained(ort_model)
+    quantizer.quantize(
+        save_dir=onnx_dir,
+        quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    )
+
+# Pooling modes in the order SentenceTransformer's Pooling module concatenates them
+POOLING_MODES = ("cls_token", "max_tokens", "mean_tokens", "mean_sqrt_len_tokens")
+
+def read_sentence_transformer_config(model_dir: str):
+    """Returns (pooling modes, normalize flag) from the model's modules.json pipeline."""
+    with open(os.path.join(model_dir, "modules.json")) as f:
+        modules = json.load(f)
+
+    pooling_modes, normalize = None, False
+    for module in modules:
+        kind = module["type"].rsplit(".", 1)[-1]
+        if kind == "Transformer":
+            continue
+        if kind == "Pooling":
+            with open(os.path.join(model_dir, module["path"], "config.json")) as f:
+                config = json.load(f)
+            unsupported = [k for k in ("pooling_mode_weightedmean_tokens", "pooling_mode_lasttoken") if config.get(k)]
+            if unsupported:
+                raise ValueError(f"ONNX encoder does not support pooling: {', '.join(unsupported)}")
+            pooling_modes = [mode for mode in POOLING_MODES if config.get(f"pooling_mode_{mode}")]
+        elif kind == "Normalize":
+            normalize = True
+        else:
+            raise ValueError(f"ONNX encoder does not support SentenceTransformer module: {module['type']}")
+
+    if not pooling_modes:
+        raise ValueError(f"No pooling mode configured in {model_dir}")
+    return pooling_modes, normalize
+
+def pool(hidden: np.ndarray, attention_mask: np.ndarray, modes: list) -> np.ndarray:
+    mask = attention_mask[..., None].astype(np.float32)
+    lengths = np.clip(mask.sum(axis=1), 1e-9, None)
+    pooled = []
+    for mode in modes:
+        if mode == "cls_token":
+            pooled.append(hidden[:, 0])
+        elif mode == "max_tokens":
+            pooled.append(np.where(mask > 0, hidden, -1e9).max(axis=1))
+        elif mode == "mean_tokens":
+            pooled.append((hidden * mask).sum(axis=1) / lengths)
+        else:
+            pooled.append((hidden * mask).sum(axis=1) / np.sqrt(lengths))
+    return np.concatenate(pooled, axis=1)
+
+class OnnxSentenceEncoder:
+    """ONNX Runtime INT8 stand-in for SentenceTransformer.encode.
+
+    Pooling and normalization follow the model's own modules.json / 1_Pooling config;
+    pipelines with modules this shim doesn't implement (e.g. Dense) are rejected.
+    """
+
+    def __init__(self, model_dir: str, onnx_dir: str):
+        self.pooling_modes, self.normalize = read_sentence_transformer_config(model_dir)
+        # Exported ahead of time: concurrent workers exporting at startup would write
+        # the same directory at once
+        if not os.path.exists(os.path.join(onnx_dir, QUANTIZED_FILE)):
+            raise FileNotFoundError(
+                f"{os.path.join(onnx_dir, QUANTIZED_FILE)} not found; run `python onnx_encoder.py` first"
+            )
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(onnx_dir, file_name=QUANTIZED_FILE)
+
+        self.max_seq_length = None
+        config_path = os.path.join(model_dir, "sentence_bert_config.json")
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                self.max_seq_length = json.load(f).get("max_seq_length")
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_tensor: bool = False,
+               normalize_embeddings: bool = False, **kwargs):
+        chunks = []
+        for start in range(0, len(sentences), batch_size):
+            inputs = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            hidden = self.model(**inputs).last_hidden_state
+            chunks.append(pool(hidden, inputs["attention_mask"], self.pooling_modes))
+
+        embeddings = np.concatenate(chunks).astype(np.float32)
+        if self.normalize or normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return torch.from_numpy(embeddings) if convert_to_tensor else embeddings
+
+def main():
+    export_quantized("models/legal_embedding_model", "models/legal_embedding_onnx")
+    print("✅ Wrote models/legal_embedding_onnx/" + QUANTIZED_FILE)
+
+if __name__ == "__main__":
+    main()